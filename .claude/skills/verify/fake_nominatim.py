@@ -0,0 +1,50 @@
+"""Minimal fake Nominatim for driving scripts/address_geocoding.py offline.
+
+Known addresses return coordinates; addresses containing 'slowtown' sleep past
+the client timeout; anything else returns an empty result list.
+"""
+import http.server
+import json
+import ssl
+import time
+from urllib.parse import urlparse, parse_qs
+
+COORDS = {
+    "rollbergstraße 28a, 12053 berlin": ("52.4790412", "13.4319106"),
+    "birkenstraße 22, 10559 berlin": ("52.53164", "13.3446063"),
+}
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        qs = parse_qs(urlparse(self.path).query)
+        q = qs.get("q", [""])[0]
+        if not q and "street" in qs:
+            q = "%s, %s %s" % (qs.get("street", [""])[0],
+                               qs.get("postalcode", [""])[0],
+                               qs.get("city", [""])[0])
+        q = q.strip().lower()
+        if "slowtown" in q:
+            time.sleep(30)
+        hit = COORDS.get(q)
+        body = json.dumps(
+            [{"lat": hit[0], "lon": hit[1], "display_name": q, "importance": 1,
+              "place_id": 1, "licence": "", "osm_type": "node", "osm_id": 1,
+              "boundingbox": [hit[0], hit[0], hit[1], hit[1]], "type": "house",
+              "class": "place"}] if hit else []
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *a):
+        pass
+
+
+srv = http.server.ThreadingHTTPServer(("127.0.0.1", 443), Handler)
+ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+ctx.load_cert_chain("/tmp/fakenom/cert.pem", "/tmp/fakenom/key.pem")
+srv.socket = ctx.wrap_socket(srv.socket, server_side=True)
+srv.serve_forever()
@@ -10,15 +10,142 @@ Author:
 Christopher-Julian Müller
 """
 
+import asyncio
+import os
+import re
+import sqlite3
 import sys
 from file_utils import read_csv, write_csv, write_failed_rows_to_textfile, write_text_to_file
+from geopy.adapters import AioHTTPAdapter
+from geopy.extra.rate_limiter import AsyncRateLimiter
 from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut
+from geopy.exc import GeocoderServiceError, GeocoderTimedOut, GeocoderUnavailable
 
-def geocode_addresses(csv_data):
+# Number of geocode requests that may be in flight at the same time.
+MAX_CONCURRENT_REQUESTS = 4
+
+# Seconds to wait for a Nominatim response. The public instance regularly needs
+# 5-15 s under load, so a short timeout just produces avoidable failures.
+GEOCODE_TIMEOUT = int(os.getenv("GEOCODE_TIMEOUT", "15"))
+
+# How often a request is attempted before the address is given up on.
+MAX_GEOCODE_ATTEMPTS = 3
+
+async def geocode_with_retry(geocode, query):
+    """
+    Calls the given geocode function, retrying failed requests with exponential
+    backoff (capped at 10 s) up to MAX_GEOCODE_ATTEMPTS attempts.
+
+    Parameters:
+    -----------
+    geocode : callable
+        The (rate limited) coroutine function performing the geocode request.
+    query : str or dict
+        The free-form address or structured component dict to resolve.
+
+    Returns:
+    --------
+    geopy.location.Location or None
+        The resolved location, or None if the address is unknown.
+
+    Raises:
+    -------
+    GeocoderServiceError
+        If the request still fails on the last attempt.
+    """
+
+    for attempt in range(1, MAX_GEOCODE_ATTEMPTS + 1):
+        try:
+            return await geocode(query, timeout=GEOCODE_TIMEOUT)
+        except GeocoderServiceError:
+            if attempt == MAX_GEOCODE_ATTEMPTS:
+                raise
+            await asyncio.sleep(min(2 ** (attempt - 1), 10))
+
+# On-disk cache of already resolved addresses, so repeat runs only query
+# Nominatim for addresses that weren't seen before.
+GEOCODE_CACHE_PATH = "geocode_cache.sqlite"
+
+# Number of new cache entries to collect before committing them to disk.
+CACHE_COMMIT_BATCH_SIZE = 100
+
+# Matches addresses of the form "Rollbergstraße 28a, 12053 Berlin".
+ADDRESS_PATTERN = re.compile(r'^\s*(?P<street>[^,]+?)\s*,\s*(?P<postalcode>\d{5})\s+(?P<city>.+?)\s*$')
+
+def split_address(street_address):
+    """
+    Splits a free-form address into the structured components of Nominatim's
+    structured query endpoint, which is faster server-side than free text.
+
+    Parameters:
+    -----------
+    street_address : str
+        The address, expected as '<street> <number>, <postal code> <city>'.
+
+    Returns:
+    --------
+    dict or None
+        The address components ('street', 'postalcode', 'city'), or None if
+        the address doesn't follow the expected format.
+    """
+
+    match = ADDRESS_PATTERN.match(street_address)
+    if not match:
+        return None
+    return match.groupdict()
+
+def open_geocode_cache(cache_path=GEOCODE_CACHE_PATH):
+    """
+    Opens (and creates if necessary) the on-disk geocode cache.
+
+    Parameters:
+    -----------
+    cache_path : str
+        The path to the SQLite cache file.
+
+    Returns:
+    --------
+    sqlite3.Connection
+        The connection to the cache database.
+    """
+
+    connection = sqlite3.connect(cache_path)
+    connection.execute("CREATE TABLE IF NOT EXISTS cache (addr TEXT PRIMARY KEY, lat REAL, lon REAL)")
+    return connection
+
+def needs_geocode(row):
+    """
+    Checks whether a row still needs to be geocoded.
+
+    Parameters:
+    -----------
+    row : dict
+        A single CSV row.
+
+    Returns:
+    --------
+    bool
+        True if the row has a street address but no coordinates yet.
+    """
+
+    # Three gets instead of up to six dict probes - this also runs for every
+    # row that is already geocoded, the common fast path on re-runs
+    return (not row.get('latitude')
+            and not row.get('longitude')
+            and bool(row.get('street_address')))
+
+async def geocode_addresses_async(csv_data):
     """
     Geocodes addresses in the 'street_address' column if 'latitude' and 'longitude' are not already present.
 
+    Duplicate addresses are geocoded only once and the result is shared between all
+    rows carrying that address.
+    The rows are geocoded concurrently (bounded by MAX_CONCURRENT_REQUESTS) so the
+    network round trips overlap instead of running strictly one after another, while
+    an AsyncRateLimiter keeps the request rate within Nominatim's usage policy.
+    Successfully resolved addresses are stored in an on-disk cache, so repeat runs
+    only hit the network for addresses that are new or still unresolved.
+
     Parameters:
     -----------
     csv_data : list of dict
@@ -31,42 +158,100 @@ def geocode_addresses(csv_data):
         - list of dict: A list of rows that couldn't be geocoded, with the reason and the address field.
     """
 
-    geolocator = Nominatim(user_agent="address_geocoding")
     failed_rows = []  # To store rows that couldn't be geocoded
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    cache = open_geocode_cache()
+    pending_cache_writes = 0
 
-    for index, row in enumerate(csv_data, start=1):
-        if ('latitude' not in row or not row['latitude']) and ('longitude' not in row or not row['longitude']):
-            if 'street_address' in row and row['street_address']:
-                try:
-                    location = geolocator.geocode(row['street_address'], timeout=5)
+    async with Nominatim(user_agent="address_geocoding", adapter_factory=AioHTTPAdapter) as geolocator:
+        # Nominatim allows at most one request per second
+        geocode = AsyncRateLimiter(geolocator.geocode, min_delay_seconds=1,
+                                   max_retries=0, swallow_exceptions=False)
 
-                    # Long and lat found for address
-                    if location:
-                        row['latitude'] = location.latitude
-                        row['longitude'] = location.longitude
+        async def geocode_address(street_address, rows):
+            nonlocal pending_cache_writes
 
-                    # Unknown address
-                    else:
-                        failed_rows.append({
-                            "row_index": index+1,
-                            "reason": "Unknown address(format?)",
-                            "name": row.get("name", "Unknown name"),
-                            "street_address": row['street_address']
-                        })
-                        row['latitude'] = None
-                        row['longitude'] = None
-
-                # API request timed out
-                except GeocoderTimedOut:
+            def mark_failed(reason):
+                for index, row in rows:
                     failed_rows.append({
-                        "row_index": index+1,
-                        "reason": "Timeout",
+                        "row_index": index,
+                        "reason": reason,
                         "name": row.get("name", "Unknown name"),
-                        "street_address": row['street_address']
+                        "street_address": street_address
                     })
                     row['latitude'] = None
                     row['longitude'] = None
 
+            # Resolved in an earlier run - no need to ask Nominatim again
+            cache_key = street_address.strip().lower()
+            cached = cache.execute("SELECT lat, lon FROM cache WHERE addr=?", (cache_key,)).fetchone()
+            if cached:
+                for _, row in rows:
+                    row['latitude'], row['longitude'] = cached
+                return
+
+            try:
+                # Prefer the structured query; fall back to free text when the
+                # address doesn't match the expected format
+                query = split_address(street_address) or street_address
+                async with semaphore:
+                    location = await geocode_with_retry(geocode, query)
+
+                    # The structured endpoint is stricter than free-text search,
+                    # so give the free-form query a chance before giving up
+                    if not location and query is not street_address:
+                        location = await geocode_with_retry(geocode, street_address)
+
+                # Long and lat found for address
+                if location:
+                    for _, row in rows:
+                        row['latitude'] = location.latitude
+                        row['longitude'] = location.longitude
+                    cache.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?)",
+                                  (cache_key, location.latitude, location.longitude))
+                    pending_cache_writes += 1
+                    if pending_cache_writes >= CACHE_COMMIT_BATCH_SIZE:
+                        cache.commit()
+                        pending_cache_writes = 0
+
+                # Unknown address
+                else:
+                    mark_failed("Unknown address(format?)")
+
+            # API request timed out
+            except (GeocoderTimedOut, GeocoderUnavailable):
+                mark_failed("Timeout")
+
+            # Any other geocoder failure (DNS, quota, ...) - report the rows
+            # instead of crashing the whole run
+            except GeocoderServiceError:
+                mark_failed("Service error")
+
+        # Group the rows by address so each distinct address is geocoded only once
+        # and the result is fanned back to every row sharing it
+        rows_by_address = {}
+        for index, row in enumerate(csv_data, start=1):
+            if needs_geocode(row):
+                rows_by_address.setdefault(row['street_address'], []).append((index, row))
+
+        tasks = [
+            geocode_address(street_address, rows)
+            for street_address, rows in rows_by_address.items()
+        ]
+        await asyncio.gather(*tasks)
+
+    cache.commit()
+    cache.close()
+
+    # Guarantee the coordinate columns on every row (rows without a street
+    # address are never touched above), so write_csv's header - taken from the
+    # first row - always includes latitude and longitude
+    for row in csv_data:
+        row.setdefault('latitude', None)
+        row.setdefault('longitude', None)
+
+    # Tasks finish in network order, so restore the CSV row order for the report
+    failed_rows.sort(key=lambda failed_row: failed_row["row_index"])
     return csv_data, failed_rows
 
 if __name__ == "__main__":
@@ -94,8 +279,10 @@ if __name__ == "__main__":
     output_csv_file_path = sys.argv[2]
     failed_rows_file_path = sys.argv[3]
 
-    csv_data = read_csv(input_csv_file_path)
-    csv_data, failed_rows = geocode_addresses(csv_data)
+    # read_csv yields lazily; geocoding mutates the rows and writes them all
+    # back out, so materialize the list here
+    csv_data = list(read_csv(input_csv_file_path))
+    csv_data, failed_rows = asyncio.run(geocode_addresses_async(csv_data))
     
     write_csv(csv_data, output_csv_file_path)
     if failed_rows:
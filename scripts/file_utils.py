@@ -1,27 +1,41 @@
+import os
 import sys
 import csv
+import tempfile
+from itertools import chain
 
-def read_csv(input_csv_file_path):
+def read_csv(input_csv_file_path, lowercase_fieldnames=False):
     """
-    Reads a CSV file and returns its data as a list of dictionaries.
+    Reads a CSV file and yields its rows as dictionaries.
+
+    The rows are yielded lazily, so consumers that stream (like write_csv)
+    never hold more than one row in memory. Callers that need random access
+    can simply wrap the call in list().
 
     Parameters:
     -----------
     input_csv_file_path : str
         The path to the input CSV file.
+    lowercase_fieldnames : bool
+        If True, the header is lowercased once so every yielded row already
+        carries lowercase keys - no per-row renaming needed downstream.
 
-    Returns:
-    --------
-    list of dict
-        The CSV data as a list of dictionaries.
+    Yields:
+    -------
+    dict
+        One CSV row at a time.
     """
 
     try:
         with open(input_csv_file_path, mode='r', newline='', encoding='utf-8-sig') as input_file:
-            sniffer = csv.Sniffer().sniff(input_file.read(), delimiters=",;")
+            # The first 64 KiB are plenty to detect the delimiter; reading the
+            # whole file here would double the I/O and hold it in memory twice
+            sniffer = csv.Sniffer().sniff(input_file.read(65536), delimiters=",;")
             input_file.seek(0)
             reader = csv.DictReader(input_file, delimiter=sniffer.delimiter)
-            return list(reader)
+            if lowercase_fieldnames:
+                reader.fieldnames = [fieldname.lower() for fieldname in reader.fieldnames]
+            yield from reader
     except FileNotFoundError:
         sys.exit(f"Error: The file '{input_csv_file_path}' was not found.")
     except Exception as e:
@@ -35,17 +49,40 @@ def write_csv(csv_data, output_csv_file_path):
     -----------
     output_csv_file_path : str
         The path to the output CSV file.
-    csv_data : list of dict
-        The CSV data as a list of dictionaries that should be written to file.
+    csv_data : iterable of dict
+        The CSV rows (list or generator) that should be written to file.
     """
 
     try:
-        if csv_data:
-            fieldnames = csv_data[0].keys()
-            with open(output_csv_file_path, mode='w', newline='', encoding='utf-8') as output_file:
-                writer = csv.DictWriter(output_file, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(csv_data)
+        # Peek at the first row for the field names, then stream all rows
+        # through without ever materializing the whole table
+        rows = iter(csv_data)
+        first_row = next(rows, None)
+        if first_row is not None:
+            fieldnames = list(first_row.keys())
+            # Write to a temporary file next to the destination and swap it in
+            # afterwards: the pipeline overwrites its input in place, and with
+            # the rows still being read lazily, opening the destination with
+            # mode='w' directly would truncate the file mid-read.
+            # A large buffer keeps the number of write syscalls low; csv.writer
+            # over plain lists skips DictWriter's per-row dict handling
+            output_file = tempfile.NamedTemporaryFile(mode='w', newline='', encoding='utf-8',
+                                                      dir=os.path.dirname(output_csv_file_path) or '.',
+                                                      suffix='.tmp', delete=False, buffering=1 << 20)
+            try:
+                with output_file:
+                    writer = csv.writer(output_file)
+                    writer.writerow(fieldnames)
+                    writer.writerows([row.get(field, '') for field in fieldnames] for row in chain([first_row], rows))
+                # Temp files are created 0600; give the result the same
+                # umask-based permissions a plain open() would have produced
+                umask = os.umask(0)
+                os.umask(umask)
+                os.chmod(output_file.name, 0o666 & ~umask)
+                os.replace(output_file.name, output_csv_file_path)
+            except BaseException:
+                os.unlink(output_file.name)
+                raise
     except Exception as e:
         sys.exit(f"An error occurred while writing to the file: {e}")
 
@@ -80,12 +117,14 @@ def write_failed_rows_to_textfile(txt_data, output_text_file_path):
     """
 
     try:
+        # Build all lines up front and write them in one call instead of one
+        # write (and potentially one syscall) per failed row
+        lines = [
+            f"[Row {row.get('row_index', 'Unknown index')}] {row.get('reason', 'Unknown reason')}: "
+            f"{row.get('name', 'Unknown name')} - {row.get('street_address', 'Unknown address')}"
+            for row in txt_data
+        ]
         with open(output_text_file_path, mode='w', encoding='utf-8') as text_file:
-            for row in txt_data:
-                row_index = row.get("row_index", "Unknown index")
-                reason = row.get("reason", "Unknown reason")
-                name = row.get("name", "Unknown name")
-                street_address = row.get("street_address", "Unknown address")
-                text_file.write(f"[Row {row_index}] {reason}: {name} - {street_address}\n")
+            text_file.write("\n".join(lines) + "\n")
     except Exception as e:
         sys.exit(f"An error occurred while writing to the text file: {e}")
\ No newline at end of file
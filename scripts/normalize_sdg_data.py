@@ -18,6 +18,81 @@ Christopher-Julian Müller
 import sys
 from file_utils import read_csv, write_csv
 
+# Translation table turning decimal commas into dots; translate with a
+# prebuilt table walks the string once without str.replace's substring search.
+DECIMAL_COMMA_TABLE = str.maketrans({',': '.'})
+
+def normalize(csv_data, rename_address=False):
+    """
+    Applies all normalization steps in a single pass over the rows.
+
+    Fuses remove_empty_rows, lowercase_column_names, add_id_column,
+    normalize_lat_lon and rename_homepage_and_create_website (plus optionally
+    rename_address_to_street_address) so the rows are walked once instead of
+    once per step. The rows are yielded lazily, so together with read_csv and
+    write_csv the whole CLI streams without materializing the table.
+    The individual functions below are kept for use on their own.
+
+    Parameters:
+    -----------
+    csv_data : iterable of dict
+        The CSV rows (list or generator).
+    rename_address : bool
+        Whether to also rename the 'address' column to 'street_address'.
+
+    Yields:
+    -------
+    dict
+        One normalized row at a time, empty rows skipped.
+    """
+
+    next_id = 1
+    rename_keys = None
+    create_homepage = rename_address_column = False
+    for row in csv_data:
+        # Skip empty rows
+        if not any(value and not value.isspace() for value in row.values()):
+            continue
+
+        # All rows share the header's keys, so the keys that need renaming and
+        # the optional-column checks are determined once from the first row -
+        # the loop body below stays free of per-row schema probes.
+        if rename_keys is None:
+            rename_keys = [(key, key.lower()) for key in row if key != key.lower()]
+            lowercase_keys = {key.lower() for key in row}
+            create_homepage = 'domain' in lowercase_keys and 'homepage' not in lowercase_keys
+            rename_address_column = rename_address and 'address' in lowercase_keys
+        for key, lowercase_key in rename_keys:
+            if key in row:
+                row[lowercase_key] = row.pop(key)
+
+        # Assign ascending ids starting from 1
+        row['id'] = next_id
+        next_id += 1
+
+        # Latitude/longitude in dot notation. The "',' in" test is a C-level
+        # scan that skips the new-string allocation for already-clean values.
+        latitude = row.get('latitude')
+        if latitude and ',' in latitude:
+            row['latitude'] = latitude.translate(DECIMAL_COMMA_TABLE)
+        longitude = row.get('longitude')
+        if longitude and ',' in longitude:
+            row['longitude'] = longitude.translate(DECIMAL_COMMA_TABLE)
+
+        # Create 'homepage' column with 'https://' prepended from domain (if necessary).
+        # The slice compare avoids a bound-method call per row.
+        if create_homepage:
+            domain = row.get('domain')
+            if domain and domain[:8] != 'https://':
+                row['homepage'] = 'https://' + domain
+            else:
+                row['homepage'] = domain
+
+        if rename_address_column:
+            row['street_address'] = row.pop('address', None)
+
+        yield row
+
 def remove_empty_rows(csv_data):
     """
     Removes empty rows from the CSV data.
@@ -33,7 +108,9 @@ def remove_empty_rows(csv_data):
         The updated CSV data with empty rows removed.
     """
 
-    return [row for row in csv_data if any(value.strip() for value in row.values())]
+    # "value and not value.isspace()" avoids allocating a stripped copy of
+    # every cell just to test for emptiness
+    return [row for row in csv_data if any(value and not value.isspace() for value in row.values())]
 
 def lowercase_column_names(csv_data):
     """
@@ -50,12 +127,15 @@ def lowercase_column_names(csv_data):
         The updated CSV data with all column names in lowercase.
     """
 
-    updated_data = []
+    # Rewrite only the keys that actually change instead of rebuilding every
+    # row dict - most columns are already lowercase
     for row in csv_data:
-        updated_row = {key.lower(): value for key, value in row.items()}
-        updated_data.append(updated_row)
+        for key in list(row):
+            lowercase_key = key.lower()
+            if lowercase_key != key:
+                row[lowercase_key] = row.pop(key)
 
-    return updated_data
+    return csv_data
 
 def add_id_column(csv_data):
     """
@@ -73,11 +153,10 @@ def add_id_column(csv_data):
         The updated CSV data with the 'id' column replaced or added.
     """
 
-    updated_data = []
+    # The rows are mutated in place anyway, so no new list is needed
     for idx, row in enumerate(csv_data, start=1):
         row['id'] = idx
-        updated_data.append(row)
-    return updated_data
+    return csv_data
 
 def normalize_lat_lon(csv_data):
     """
@@ -95,10 +174,12 @@ def normalize_lat_lon(csv_data):
     """
 
     for row in csv_data:
-        if 'latitude' in row:
-            row['latitude'] = row['latitude'].replace(',', '.')
-        if 'longitude' in row:
-            row['longitude'] = row['longitude'].replace(',', '.')
+        latitude = row.get('latitude')
+        if latitude and ',' in latitude:
+            row['latitude'] = latitude.translate(DECIMAL_COMMA_TABLE)
+        longitude = row.get('longitude')
+        if longitude and ',' in longitude:
+            row['longitude'] = longitude.translate(DECIMAL_COMMA_TABLE)
     return csv_data
 
 def rename_homepage_and_create_website(csv_data):
@@ -119,14 +200,18 @@ def rename_homepage_and_create_website(csv_data):
         a new 'homepage' column added with value "https://" + domain.
     """
 
+    # A uniform CSV either has the columns in every row or in none, so decide
+    # once on the first row instead of probing inside the loop
+    if not csv_data or 'domain' not in csv_data[0] or 'homepage' in csv_data[0]:
+        return csv_data
+
     for row in csv_data:
-        if 'domain' in row:
-            if 'homepage' not in row:
-                # Create 'homepage' column with 'https://' prepended from domain (if necessary)
-                if row['domain'] and not row['domain'].startswith('https://'):
-                    row['homepage'] = f"https://{row['domain']}"
-                else:
-                    row['homepage'] = row['domain']
+        # Create 'homepage' column with 'https://' prepended from domain (if necessary)
+        domain = row.get('domain')
+        if domain and domain[:8] != 'https://':
+            row['homepage'] = 'https://' + domain
+        else:
+            row['homepage'] = domain
     return csv_data
 
 def rename_address_to_street_address(csv_data):
@@ -144,9 +229,12 @@ def rename_address_to_street_address(csv_data):
         The updated CSV data with the 'address' column renamed to 'street_address'.
     """
 
+    # Same schema shortcut as above: check the first row, not every row
+    if not csv_data or 'address' not in csv_data[0]:
+        return csv_data
+
     for row in csv_data:
-        if 'address' in row:
-            row['street_address'] = row.pop('address')
+        row['street_address'] = row.pop('address', None)
     return csv_data
 
 def add_cover_image_id(input_csv_data, cover_csv_data):
@@ -156,38 +244,51 @@ def add_cover_image_id(input_csv_data, cover_csv_data):
 
     Parameters:
     -----------
-    input_csv_data : list of dict
-        The main CSV data as a list of dictionaries.
-    cover_csv_data : list of dict
-        The cover CSV data as a list of dictionaries.
-
-    Returns:
-    --------
-    list of dict
-        The updated input CSV data with the 'cover_image_id' column added to matching rows.
+    input_csv_data : iterable of dict
+        The main CSV rows (list or generator).
+    cover_csv_data : iterable of dict
+        The cover CSV rows; fully consumed up front for the lookup table.
+
+    Yields:
+    -------
+    dict
+        One input row at a time, with 'cover_image_id' added to matching rows.
     """
 
-    # Reduce time complexity by creating a lookup table for the cover ids
-    cover_lookup = {}
-    for row in cover_csv_data:
-        if row.get('name'):
-            cover_lookup[row['name'].strip().lower()] = row.get('cover_image_id')
-        if row.get('domain'):
-            cover_lookup[row['domain'].strip().lower()] = row.get('cover_image_id')
-
-    # Add 'cover_image_id' column to matching row in the input CSV
+    # Memoize the strip/lower normalization: organisations appearing in many
+    # rows then pay for it once instead of once per occurrence
+    normalized_keys = {}
+    def normalize_key(value):
+        key = normalized_keys.get(value)
+        if key is None:
+            key = value.strip().lower()
+            normalized_keys[value] = key
+        return key
+
+    # Reduce time complexity by creating lookup tables for the cover ids, one
+    # per match field so a name match always beats a colliding domain
+    # ("preferably name"). The dict comprehensions run the build loops in C;
+    # rows without the field all collapse onto the '' key, popped afterwards.
+    cover_rows = list(cover_csv_data)
+    by_name = {normalize_key(row.get('name') or ''): row.get('cover_image_id') for row in cover_rows}
+    by_name.pop('', None)
+    by_domain = {normalize_key(row.get('domain') or ''): row.get('cover_image_id') for row in cover_rows}
+    by_domain.pop('', None)
+
+    # Add 'cover_image_id' column to matching row in the input CSV.
+    # Each lookup key is computed once and probed once via dict.get.
     for row in input_csv_data:
-        cover_image_id = None
-        if 'name' in row and row['name'].strip().lower() in cover_lookup:
-            cover_image_id = cover_lookup[row['name'].strip().lower()]
-        elif 'domain' in row and row['domain'].strip().lower() in cover_lookup:
-            cover_image_id = cover_lookup[row['domain'].strip().lower()]
-        
-        # Add the respective ID to the new column in the matching row
-        if cover_image_id:
-            row['cover_image_id'] = cover_image_id
-
-    return input_csv_data
+        name_key = normalize_key(row.get('name') or '')
+        domain_key = normalize_key(row.get('domain') or '')
+        cover_image_id = by_name.get(name_key) or by_domain.get(domain_key)
+
+        # Add the respective ID to the new column. The column is materialized
+        # on every row (empty when there is no match and no existing value),
+        # so write_csv's header - taken from the first row - always carries it
+        # even when the first row happens not to match.
+        row['cover_image_id'] = cover_image_id or row.get('cover_image_id') or ''
+
+        yield row
 
 if __name__ == "__main__":
     if len(sys.argv) < 3 or len(sys.argv) > 5:
@@ -205,22 +306,16 @@ if __name__ == "__main__":
     if mode not in ["all", "minimal"]:
         sys.exit(f"Error: Invalid mode '{mode}'. Mode must be 'all' or 'minimal'.")
 
-    # Read the input CSV
-    csv_data = read_csv(input_csv_file_path)
-
-    # Minimal mode (used within Pipeline)
-    csv_data = remove_empty_rows(csv_data)
-    csv_data = lowercase_column_names(csv_data)
-    csv_data = add_id_column(csv_data)
-    csv_data = normalize_lat_lon(csv_data)
-    csv_data = rename_homepage_and_create_website(csv_data)
+    # Read the input CSV; lowercasing the header at the reader means the rows
+    # arrive with lowercase keys and the per-row rename in normalize() is a no-op
+    csv_data = read_csv(input_csv_file_path, lowercase_fieldnames=True)
 
-    if mode == "all":
-        csv_data = rename_address_to_street_address(csv_data)
+    # One fused pass covers the minimal steps and (in "all" mode) the address rename
+    csv_data = normalize(csv_data, rename_address=(mode == "all"))
 
-        if cover_csv_file_path:
-            cover_csv_data = read_csv(cover_csv_file_path)
-            csv_data = add_cover_image_id(csv_data, cover_csv_data)
+    if mode == "all" and cover_csv_file_path:
+        cover_csv_data = read_csv(cover_csv_file_path)
+        csv_data = add_cover_image_id(csv_data, cover_csv_data)
 
     # Write the output CSV
     write_csv(csv_data, final_output_csv_file_path)
\ No newline at end of file